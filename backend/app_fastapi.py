@@ -1,23 +1,78 @@
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import httpx
+import orjson
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import ValueTarget
+from streaming_form_data.validators import MaxSizeValidator, ValidationError
+from streaming_form_data.parser import ParseFailedException
 
-from backend.azure_vision import analyze_image
-from backend.azure_openai import generate_insights
-from backend.physical_processing import evaluate_physical_scan
-from backend.cognitive_processing import evaluate_cognitive_scan
-
+# Load .env before backend modules read their settings at import
 load_dotenv()
 
+from backend.cache import LRUCache
+from backend.pipeline import ScanPipeline
+from backend.scoring import warm_up
+
+# Threads for blocking Azure / OpenAI round-trips
+IO_THREADS = int(os.environ.get("LIFESCAN_IO_THREADS", 16))
+# Entries per result cache (vision by image hash, insights by scores)
+CACHE_SIZE = int(os.environ.get("LIFESCAN_CACHE_SIZE", 512))
+# Seconds a generated insight is reused for identical scores
+INSIGHTS_TTL = float(os.environ.get("LIFESCAN_INSIGHTS_TTL", 3600))
+
+
+# -------------------------
+# Lifecycle
+# -------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.pool = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="lifescan-io")
+    # Compile scoring kernels before serving, off the event loop
+    await asyncio.get_running_loop().run_in_executor(app.state.pool, warm_up)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=20,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    )
+    app.state.vision_cache = LRUCache(CACHE_SIZE)
+    app.state.insights_cache = LRUCache(CACHE_SIZE, ttl=INSIGHTS_TTL)
+    app.state.pipeline = ScanPipeline(
+        app.state.pool,
+        app.state.http,
+        vision_cache=app.state.vision_cache,
+        insights_cache=app.state.insights_cache,
+    )
+    app.state.pipeline.start()
+    try:
+        yield
+    finally:
+        await app.state.pipeline.stop()
+        await app.state.http.aclose()
+        app.state.pool.shutdown(wait=False)
+
+
 # -------------------------
 # App
 # -------------------------
-APP = FastAPI(title="LifeScan AI")
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+APP = FastAPI(title="LifeScan AI", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 APP.add_middleware(
     CORSMiddleware,
@@ -26,37 +81,90 @@ APP.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Default scan responses are a few hundred bytes and go out as-is; this only
+# kicks in for LIFESCAN_DEBUG=1 responses (raw features) or other large bodies
+APP.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 # -------------------------
 # Utils
 # -------------------------
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp", "bmp", "gif"}
+ALLOWED_EXTENSIONS = ("png", "jpg", "jpeg", "webp", "bmp", "gif")
+ALLOWED_SUFFIXES = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS)
+# Leading bytes of PNG, JPEG, GIF and BMP files (WebP is checked separately)
+IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a", b"GIF89a", b"BM")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_CONTENT_LENGTH", 10 * 1024 * 1024))
+# Echo raw vision features / scores in responses (debugging only)
+DEBUG = os.environ.get("LIFESCAN_DEBUG") == "1"
 
 
 def _is_allowed(filename: Optional[str]) -> bool:
-    return filename and "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-
-async def _read_image(upload: UploadFile) -> bytes:
-    if not _is_allowed(upload.filename):
+    return bool(filename) and filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def _is_image(data: bytes) -> bool:
+    return data.startswith(IMAGE_SIGNATURES) or (data[:4] == b"RIFF" and data[8:12] == b"WEBP")
+
+
+async def _read_image(request: Request) -> bytes:
+    """
+    Feed the request stream straight into the C multipart parser and keep
+    only the "image" field in memory.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    target = ValueTarget(validator=MaxSizeValidator(MAX_UPLOAD_BYTES))
+    try:
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register("image", target)
+        async for chunk in request.stream():
+            parser.data_received(chunk)
+    except ValidationError:
+        raise HTTPException(status_code=413, detail="Image too large")
+    except (ParseFailedException, ValueError):
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    if target.multipart_filename is None:
+        raise HTTPException(status_code=400, detail="No image uploaded")
+    if not _is_allowed(target.multipart_filename):
         raise HTTPException(status_code=400, detail="Unsupported file type")
-    data = await upload.read()
+    data = target.value
     if not data:
         raise HTTPException(status_code=400, detail="Empty image")
+    if not _is_image(data):
+        raise HTTPException(status_code=415, detail="File content is not a supported image")
     return data
 
 
+# Score field aliases, in priority order
+_HEALTH_SCORE_KEYS = ("healthScore", "health_score", "score", "health")
+_COGNITIVE_SCORE_KEYS = ("cognitiveScore", "cognitive_score", "cognitive")
+
+
+def _first(d: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        value = d.get(key)
+        if value is not None:
+            return value
+    return None
+
+
 def _shape_response(mode: str, features: Dict[str, Any], scores: Dict[str, Any], explanation: str):
-    return {
+    response = {
         "mode": mode,
         "summary": explanation,
-        "healthScore": scores.get("healthScore") or scores.get("score"),
+        "healthScore": _first(scores, _HEALTH_SCORE_KEYS),
+        "cognitiveScore": _first(scores, _COGNITIVE_SCORE_KEYS),
         "confidence": scores.get("confidence", 0.9),
         "highlights": scores.get("highlights", []),
         "recommendations": scores.get("recommendations", []),
-        "features": features,
-        "scores": scores,
     }
+    if DEBUG:
+        response["features"] = features
+        response["scores"] = scores
+    return {k: v for k, v in response.items() if v is not None}
 
 
 # -------------------------
@@ -71,35 +179,31 @@ async def health():
 # Physical Scan
 # -------------------------
 @APP.post("/api/scan/physical")
-async def physical_scan(image: UploadFile = File(...)):
-    img = await _read_image(image)
-    features = analyze_image(img)
-    scores = evaluate_physical_scan(features)
-    explanation = generate_insights(scores)
-    return JSONResponse(_shape_response("physical", features, scores, explanation))
+async def physical_scan(request: Request):
+    img = await _read_image(request)
+    features, scores, explanation = await APP.state.pipeline.submit("physical", img)
+    return _shape_response("physical", features, scores, explanation)
 
 
 # -------------------------
 # Cognitive Scan
 # -------------------------
 @APP.post("/api/scan/cognitive")
-async def cognitive_scan(image: UploadFile = File(...)):
-    img = await _read_image(image)
-    features = analyze_image(img)
-    scores = evaluate_cognitive_scan(features)
-    explanation = generate_insights(scores)
-    return JSONResponse(_shape_response("cognitive", features, scores, explanation))
+async def cognitive_scan(request: Request):
+    img = await _read_image(request)
+    features, scores, explanation = await APP.state.pipeline.submit("cognitive", img)
+    return _shape_response("cognitive", features, scores, explanation)
 
 
 # -------------------------
 # Frontend Convenience Endpoint
 # -------------------------
 @APP.post("/scan")
-async def scan(image: UploadFile = File(...), mode: str = "physical"):
+async def scan(request: Request, mode: str = "physical"):
     mode = mode.lower()
     if mode == "physical":
-        return await physical_scan(image)
-    return await cognitive_scan(image)
+        return await physical_scan(request)
+    return await cognitive_scan(request)
 
 
 # -------------------------
@@ -107,9 +211,14 @@ async def scan(image: UploadFile = File(...), mode: str = "physical"):
 # -------------------------
 if __name__ == "__main__":
     import uvicorn
+
+    # Single-worker dev runner; "auto" picks uvloop/httptools when installed.
+    # Production: gunicorn -c backend/gunicorn.conf.py backend.app_fastapi:APP
     uvicorn.run(
         "backend.app_fastapi:APP",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="auto",
+        http="auto",
+        reload=os.environ.get("LIFESCAN_RELOAD") == "1",
     )
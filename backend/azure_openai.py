@@ -1,3 +1,15 @@
+import os
+
+import httpx
+
+
+def openai_configured() -> bool:
+    return os.environ.get("LIFESCAN_USE_AZURE") == "1" and all(
+        os.environ.get(name)
+        for name in ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT")
+    )
+
+
 def generate_insights(scores: dict) -> str:
     """
     MOCK Azure OpenAI response
@@ -8,3 +20,29 @@ def generate_insights(scores: dict) -> str:
         "of possible fatigue or stress. Consider hydration, balanced "
         "nutrition, regular sleep, and short breaks."
     )
+
+
+async def generate_insights_remote(client: httpx.AsyncClient, scores: dict) -> str:
+    """
+    Azure OpenAI chat completion, sent over the shared keep-alive client.
+    """
+    url = (
+        f"{os.environ['AZURE_OPENAI_ENDPOINT'].rstrip('/')}/openai/deployments/"
+        f"{os.environ['AZURE_OPENAI_DEPLOYMENT']}/chat/completions"
+    )
+    payload = {
+        "messages": [
+            {"role": "system", "content": "You summarize health image analysis safely and briefly."},
+            {"role": "user", "content": f"Scan results: {scores}\nProvide a brief health summary."},
+        ],
+        "temperature": 0.2,
+        "max_tokens": 200,
+    }
+    res = await client.post(
+        url,
+        headers={"api-key": os.environ["AZURE_OPENAI_KEY"]},
+        params={"api-version": os.environ.get("AZURE_OPENAI_API_VERSION", "2024-02-01")},
+        json=payload,
+    )
+    res.raise_for_status()
+    return res.json()["choices"][0]["message"]["content"].strip()
@@ -1,3 +1,20 @@
+import io
+import os
+
+import httpx
+from PIL import Image, ImageOps
+
+VISION_MAX_EDGE = int(os.environ.get("VISION_MAX_EDGE", 1280))
+
+
+def vision_configured() -> bool:
+    # Opt-in: credentials alone (e.g. shared with the Flask server) keep the mock
+    return (
+        os.environ.get("LIFESCAN_USE_AZURE") == "1"
+        and bool(os.environ.get("AZURE_VISION_ENDPOINT") and os.environ.get("AZURE_VISION_KEY"))
+    )
+
+
 def analyze_image(img_bytes: bytes):
     """
     Mock Azure Vision response.
@@ -11,3 +28,39 @@ def analyze_image(img_bytes: bytes):
             {"age": 23}
         ]
     }
+
+
+def prepare_for_vision(img_bytes: bytes, max_edge: int = VISION_MAX_EDGE) -> bytes:
+    """
+    Bytes to send to Azure Vision: oversized images shrunk to max_edge as JPEG.
+    Images already within max_edge, or that PIL cannot read, pass through.
+    """
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as img:
+            if max(img.size) <= max_edge:
+                return img_bytes
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_edge, max_edge))
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+            return buf.getvalue()
+    except Exception:
+        return img_bytes
+
+
+async def analyze_image_remote(client: httpx.AsyncClient, img_bytes: bytes):
+    """
+    Azure Computer Vision v3.2 analyze, sent over the shared keep-alive client.
+    """
+    url = f"{os.environ['AZURE_VISION_ENDPOINT'].rstrip('/')}/vision/v3.2/analyze"
+    res = await client.post(
+        url,
+        headers={
+            "Ocp-Apim-Subscription-Key": os.environ["AZURE_VISION_KEY"],
+            "Content-Type": "application/octet-stream",
+        },
+        params={"visualFeatures": "Color,Faces"},
+        content=img_bytes,
+    )
+    res.raise_for_status()
+    return res.json()
@@ -0,0 +1,40 @@
+"""
+Production server config:
+
+    gunicorn -c backend/gunicorn.conf.py backend.app_fastapi:APP
+
+One Uvicorn worker process per usable core, app imported once in the master
+(preload) and forked. Per-worker state (thread pool, HTTP client, caches,
+pipeline) is created in each worker's lifespan startup, after the fork.
+"""
+import multiprocessing
+import os
+
+
+def _usable_cores():
+    # Respects container / taskset CPU limits where the platform exposes them
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", len(_usable_cores())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Runs in the arbiter: give the new worker the lowest core no live worker
+    # holds. With more workers than cores, pinning would stack them, so skip it.
+    worker.core = None
+    cores = _usable_cores()
+    if not hasattr(os, "sched_setaffinity") or server.num_workers > len(cores):
+        return
+    taken = {getattr(w, "core", None) for w in server.WORKERS.values()}
+    worker.core = next((c for c in cores if c not in taken), None)
+
+
+def post_fork(server, worker):
+    if worker.core is not None:
+        os.sched_setaffinity(0, {worker.core})
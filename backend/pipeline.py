@@ -0,0 +1,212 @@
+"""
+Scan pipeline: vision -> scoring -> insights.
+
+Each stage has its own bounded asyncio.Queue and worker tasks, so while one
+request waits on the vision call another can already be waiting on the LLM.
+Remote Azure calls go through the shared httpx client when configured; the
+blocking mock fallbacks run on the given executor, never on the event loop.
+The vision stage has a single collector that drains the queue without any
+delay window: an image identical to one already in flight joins that call,
+anything else starts a new call, with at most max_running calls at a time.
+Vision results are cached by image hash and insights by the scores they were
+built from, so re-uploads skip both calls.
+Endpoints submit a job and await its future.
+"""
+import asyncio
+import hashlib
+import os
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+from fastapi import HTTPException
+
+from backend.cache import LRUCache
+from backend.azure_vision import analyze_image, analyze_image_remote, prepare_for_vision, vision_configured
+from backend.azure_openai import generate_insights, generate_insights_remote, openai_configured
+from backend.physical_processing import evaluate_physical_scan
+from backend.cognitive_processing import evaluate_cognitive_scan
+
+# Workers per I/O-bound stage / jobs allowed to wait per stage
+MAX_RUNNING = int(os.environ.get("LIFESCAN_MAX_RUNNING", 8))
+MAX_QUEUED = int(os.environ.get("LIFESCAN_MAX_QUEUED", 64))
+
+EVALUATORS = {
+    "physical": evaluate_physical_scan,
+    "cognitive": evaluate_cognitive_scan,
+}
+
+ScanResult = Tuple[Dict[str, Any], Dict[str, Any], str]
+
+
+def _has_scan_data(mode: str, features: Dict[str, Any]) -> bool:
+    """Real Vision output may lack the face / colour block a mode scores on."""
+    if mode == "physical":
+        color = features.get("color")
+        return isinstance(color, dict) and "dominantColorForeground" in color
+    faces = features.get("faces")
+    if not (isinstance(faces, list) and faces and isinstance(faces[0], dict)):
+        return False
+    age = faces[0].get("age")
+    return isinstance(age, (int, float)) and not isinstance(age, bool)
+
+
+class _Job:
+    __slots__ = ("mode", "image", "future", "features", "scores")
+
+    def __init__(self, mode: str, image: bytes, future: asyncio.Future):
+        self.mode = mode
+        self.image = image
+        self.future = future
+        self.features: Optional[Dict[str, Any]] = None
+        self.scores: Optional[Dict[str, Any]] = None
+
+
+class ScanPipeline:
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        vision_cache: Optional[LRUCache] = None,
+        insights_cache: Optional[LRUCache] = None,
+        max_running: int = MAX_RUNNING,
+        max_queued: int = MAX_QUEUED,
+    ):
+        self.executor = executor
+        self.http = http
+        self.vision_cache = vision_cache if vision_cache is not None else LRUCache()
+        self.insights_cache = insights_cache if insights_cache is not None else LRUCache()
+        self.max_running = max_running
+        self._vision: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._score: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._llm: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._tasks: List[asyncio.Task] = []
+        # Vision calls in flight, by image digest, with the jobs waiting on them
+        self._inflight: Dict[bytes, List[_Job]] = {}
+        self._vision_slots = asyncio.Semaphore(max_running)
+        self._vision_calls: "set[asyncio.Task]" = set()
+
+    def start(self) -> None:
+        self._tasks.append(asyncio.create_task(self._vision_collector()))
+        for _ in range(self.max_running):
+            self._tasks.append(asyncio.create_task(self._llm_worker()))
+        # Scoring is cheap CPU work on the loop; one worker keeps up
+        self._tasks.append(asyncio.create_task(self._score_worker()))
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._vision_calls)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        for jobs in self._inflight.values():
+            for job in jobs:
+                self._fail(job, HTTPException(status_code=503, detail="Server shutting down"))
+        self._inflight.clear()
+        for queue in (self._vision, self._score, self._llm):
+            while not queue.empty():
+                self._fail(queue.get_nowait(), HTTPException(status_code=503, detail="Server shutting down"))
+
+    async def submit(self, mode: str, image: bytes) -> ScanResult:
+        job = _Job(mode, image, asyncio.get_running_loop().create_future())
+        if self._vision.full():
+            # Shed the oldest waiting scan rather than block new arrivals
+            self._fail(self._vision.get_nowait(), HTTPException(status_code=503, detail="Scan queue full"))
+        self._vision.put_nowait(job)
+        return await job.future
+
+    # -------------------------
+    # Calls
+    # -------------------------
+    async def _analyze(self, key: bytes, image: bytes) -> Dict[str, Any]:
+        features = self.vision_cache.get(key)
+        if features is not None:
+            return features
+        loop = asyncio.get_running_loop()
+        if self.http is not None and vision_configured():
+            # Resizing is CPU-bound, keep it off the event loop
+            vision_bytes = await loop.run_in_executor(self.executor, prepare_for_vision, image)
+            features = await analyze_image_remote(self.http, vision_bytes)
+        else:
+            features = await loop.run_in_executor(self.executor, analyze_image, image)
+        self.vision_cache.put(key, features)
+        return features
+
+    async def _insights(self, scores: Dict[str, Any]) -> str:
+        key = hashlib.sha1(orjson.dumps(scores, option=orjson.OPT_SORT_KEYS)).digest()
+        explanation = self.insights_cache.get(key)
+        if explanation is not None:
+            return explanation
+        if self.http is not None and openai_configured():
+            explanation = await generate_insights_remote(self.http, scores)
+        else:
+            explanation = await asyncio.get_running_loop().run_in_executor(self.executor, generate_insights, scores)
+        self.insights_cache.put(key, explanation)
+        return explanation
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    async def _vision_collector(self) -> None:
+        while True:
+            job = await self._vision.get()
+            if job.future.done():
+                continue
+            key = hashlib.blake2b(job.image, digest_size=16).digest()
+            waiting = self._inflight.get(key)
+            if waiting is not None:
+                waiting.append(job)
+                continue
+            self._inflight[key] = [job]
+            await self._vision_slots.acquire()
+            task = asyncio.create_task(self._vision_call(key, job.image))
+            self._vision_calls.add(task)
+            task.add_done_callback(self._vision_calls.discard)
+
+    async def _vision_call(self, key: bytes, image: bytes) -> None:
+        try:
+            features = await self._analyze(key, image)
+        except Exception as exc:
+            for job in self._inflight.pop(key, ()):
+                self._fail(job, exc)
+            return
+        finally:
+            self._vision_slots.release()
+        for job in self._inflight.pop(key, ()):
+            job.features = features
+            job.image = None
+            await self._score.put(job)
+
+    async def _score_worker(self) -> None:
+        while True:
+            job = await self._score.get()
+            if job.future.done():
+                continue
+            if not _has_scan_data(job.mode, job.features):
+                self._fail(job, HTTPException(status_code=422, detail="No face or colour data found in image"))
+                continue
+            try:
+                job.scores = EVALUATORS[job.mode](job.features)
+            except Exception as exc:
+                self._fail(job, exc)
+                continue
+            await self._llm.put(job)
+
+    async def _llm_worker(self) -> None:
+        while True:
+            job = await self._llm.get()
+            if job.future.done():
+                continue
+            try:
+                explanation = await self._insights(job.scores)
+            except Exception as exc:
+                self._fail(job, exc)
+                continue
+            if not job.future.done():
+                job.future.set_result((job.features, job.scores, explanation))
+
+    @staticmethod
+    def _fail(job: _Job, exc: BaseException) -> None:
+        if not job.future.done():
+            job.future.set_exception(exc)
@@ -0,0 +1,48 @@
+"""
+Numeric scoring kernels behind the physical / cognitive evaluators.
+
+Kernels take contiguous float64 arrays of shape (B,), so a batch of scans is
+scored in one call; the evaluators pass B=1. Compiled with Numba and cached
+on disk; warm_up() forces compilation at startup instead of on the first scan.
+"""
+from typing import Sequence
+
+import numpy as np
+from numba import njit
+
+PALE_COLORS = ("White", "Gray")
+
+
+@njit(cache=True)
+def _anemia_risk(pale: np.ndarray) -> np.ndarray:
+    out = np.empty(pale.shape[0])
+    for i in range(pale.shape[0]):
+        out[i] = 0.7 if pale[i] > 0.5 else 0.4
+    return out
+
+
+@njit(cache=True)
+def _stress_score(ages: np.ndarray) -> np.ndarray:
+    out = np.empty(ages.shape[0])
+    for i in range(ages.shape[0]):
+        out[i] = 0.8 if ages[i] > 20.0 else 0.4
+    return out
+
+
+def anemia_risk(dominant_colors: Sequence[str]) -> np.ndarray:
+    pale = np.fromiter((c in PALE_COLORS for c in dominant_colors), dtype=np.float64, count=len(dominant_colors))
+    return _anemia_risk(pale)
+
+
+def stress_score(ages: Sequence[float]) -> np.ndarray:
+    # NumPy would coerce None to NaN and "23" to 23.0; the original
+    # "age > 20" comparison raised TypeError for both
+    for age in ages:
+        if isinstance(age, bool) or not isinstance(age, (int, float)):
+            raise TypeError(f"age must be a number, got {type(age).__name__}")
+    return _stress_score(np.ascontiguousarray(ages, dtype=np.float64))
+
+
+def warm_up() -> None:
+    anemia_risk(PALE_COLORS[:1])
+    stress_score([0.0])
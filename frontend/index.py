@@ -9,12 +9,13 @@ LifeScan AI — Frontend + Scan Backend Server (Final)
 - Deterministic mock fallback
 """
 
+import io
 import os
 import uuid
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 from flask import Flask, request, jsonify, send_from_directory, abort, safe_join
 from werkzeug.utils import secure_filename
@@ -29,30 +30,47 @@ except Exception:
     CORS_AVAILABLE = False
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageOps
     PIL_AVAILABLE = True
 except Exception:
     PIL_AVAILABLE = False
 
+try:
+    import imagesize
+    IMAGESIZE_AVAILABLE = True
+except Exception:
+    IMAGESIZE_AVAILABLE = False
+
 
 # --------------------------------------------------
 # Configuration
 # --------------------------------------------------
 BASE_DIR = Path(__file__).resolve().parent
 UPLOAD_DIR = Path(os.environ.get("UPLOAD_FOLDER", BASE_DIR / "uploads"))
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Uploads are processed in memory; set KEEP_UPLOADS=1 to also retain them on disk
+KEEP_UPLOADS = os.environ.get("KEEP_UPLOADS") == "1"
+if KEEP_UPLOADS:
+    UPLOAD_DIR.mkdir(exist_ok=True)
 
 MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 10 * 1024 * 1024))
+# Longest edge sent to Azure Vision; larger uploads are downscaled first
+VISION_MAX_EDGE = int(os.environ.get("VISION_MAX_EDGE", 1280))
 
 AZURE_ENDPOINT = os.environ.get("AZURE_VISION_ENDPOINT")
 AZURE_KEY = os.environ.get("AZURE_VISION_KEY")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
+ALLOWED_EXTENSIONS = ("png", "jpg", "jpeg", "webp")
+ALLOWED_SUFFIXES = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS)
+# Leading bytes of PNG and JPEG files (WebP is checked separately)
+IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("lifescan")
 
+# Shared session so Azure/OpenAI calls reuse keep-alive connections
+HTTP = requests.Session()
+
 # --------------------------------------------------
 # Flask App
 # --------------------------------------------------
@@ -67,21 +85,59 @@ if CORS_AVAILABLE:
 # Helpers
 # --------------------------------------------------
 def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+
+def is_image(data: bytes) -> bool:
+    return data.startswith(IMAGE_SIGNATURES) or (data[:4] == b"RIFF" and data[8:12] == b"WEBP")
 
 
-def save_upload(file) -> Path:
-    filename = secure_filename(file.filename)
-    name = f"{uuid.uuid4().hex}_{filename}"
+def save_upload(filename: str, img_bytes: bytes) -> Path:
+    name = f"{uuid.uuid4().hex}_{secure_filename(filename)}"
     path = UPLOAD_DIR / name
-    file.save(path)
+    path.write_bytes(img_bytes)
     return path
 
 
+def image_dimensions(img_bytes: bytes) -> Tuple[int, int]:
+    """Width/height from the image header only; pixel data is never decoded."""
+    if IMAGESIZE_AVAILABLE:
+        try:
+            width, height = imagesize.get(io.BytesIO(img_bytes))
+            if width > 0 and height > 0:
+                return width, height
+        except Exception:
+            pass
+    if PIL_AVAILABLE:
+        try:
+            with Image.open(io.BytesIO(img_bytes)) as img:
+                return img.size
+        except Exception:
+            pass
+    return 1280, 720
+
+
 # --------------------------------------------------
 # Azure Vision
 # --------------------------------------------------
-def azure_analyze(image_path: Path) -> Dict[str, Any]:
+def prepare_for_vision(img_bytes: bytes) -> bytes:
+    """Downscale to VISION_MAX_EDGE and re-encode as JPEG q85 before upload."""
+    if not PIL_AVAILABLE:
+        return img_bytes
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as img:
+            if max(img.size) <= VISION_MAX_EDGE:
+                return img_bytes
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE))
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, "JPEG", quality=85, optimize=True)
+            return buf.getvalue()
+    except Exception:
+        return img_bytes
+
+
+def azure_analyze(img_bytes: bytes) -> Dict[str, Any]:
     if not AZURE_ENDPOINT or not AZURE_KEY:
         raise RuntimeError("Azure not configured")
 
@@ -92,10 +148,7 @@ def azure_analyze(image_path: Path) -> Dict[str, Any]:
     }
     params = {"visualFeatures": "Description,Tags,Faces,Objects"}
 
-    with open(image_path, "rb") as f:
-        img = f.read()
-
-    res = requests.post(url, headers=headers, params=params, data=img, timeout=20)
+    res = HTTP.post(url, headers=headers, params=params, data=img_bytes, timeout=20)
     res.raise_for_status()
     return res.json()
 
@@ -122,7 +175,7 @@ def openai_summary(prompt: str) -> str:
         "max_tokens": 200,
     }
 
-    res = requests.post(
+    res = HTTP.post(
         "https://api.openai.com/v1/chat/completions",
         headers={
             "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -138,14 +191,8 @@ def openai_summary(prompt: str) -> str:
 # --------------------------------------------------
 # Mock Response (Deterministic)
 # --------------------------------------------------
-def mock_response(image_path: Path, mode: str) -> Dict[str, Any]:
-    width, height = (1280, 720)
-    if PIL_AVAILABLE:
-        try:
-            with Image.open(image_path) as img:
-                width, height = img.size
-        except Exception:
-            pass
+def mock_response(img_bytes: bytes, mode: str) -> Dict[str, Any]:
+    width, height = image_dimensions(img_bytes)
 
     return {
         "summary": "No immediate health risks detected.",
@@ -193,17 +240,23 @@ def scan():
 
     mode = request.form.get("mode", "cognitive")
 
-    saved = None
+    img_bytes = file.read()
+    if not img_bytes:
+        return jsonify({"error": "Empty image"}), 400
+    if not is_image(img_bytes):
+        return jsonify({"error": "File content is not a supported image"}), 415
+
     try:
-        saved = save_upload(file)
+        if KEEP_UPLOADS:
+            save_upload(file.filename, img_bytes)
 
         # Azure attempt
         result = None
         if AZURE_ENDPOINT and AZURE_KEY:
-            result = azure_analyze(saved)
+            result = azure_analyze(prepare_for_vision(img_bytes))
 
         if not result:
-            return jsonify(mock_response(saved, mode))
+            return jsonify(mock_response(img_bytes, mode))
 
         # Build OpenAI prompt
         desc = result.get("description", {}).get("captions", [{}])[0].get("text", "")
@@ -230,13 +283,6 @@ def scan():
         logger.exception("Scan failed")
         return jsonify({"error": "Scan failed"}), 500
 
-    finally:
-        if saved and saved.exists():
-            try:
-                saved.unlink()
-            except Exception:
-                pass
-
 
 @app.route("/<path:filename>")
 def static_files(filename):